@@ -0,0 +1,363 @@
+# src/benchmark.py
+
+import argparse
+import io
+import json
+import platform
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import zarr
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+from data_loader import ToyotaSceneAnalyzer
+from model_trainer import GraniteModelTrainer
+from old_scene_analyzer import ToyotaScenarioGenerator
+from synthetic_dataset import SyntheticDatasetGenerator
+
+console = Console()
+
+INTERVAL_FIELDS = {
+    'scenes': [('frame_index_interval', 'frames')],
+    'frames': [('agent_index_interval', 'agents'),
+               ('traffic_light_faces_index_interval', 'traffic_light_faces')],
+}
+
+
+class StubCompletionServer:
+    """Local /completion endpoint that answers after a fixed latency"""
+
+    def __init__(self, latency_ms=50.0, host="127.0.0.1", port=0):
+        latency = latency_ms / 1000.0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                time.sleep(latency)
+                body = json.dumps({
+                    "content": "Feature: Stub\nScenario: Stub\n  Given a scene\n"
+                               f"  When {len(payload.get('prompt', ''))} prompt characters arrive\n"
+                               "  Then a scenario is returned"
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/completion"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def build_scaled_store(source_path, target_path, scale):
+    """Write a store holding `scale` back-to-back copies of the source store
+
+    Interval fields are shifted so every copy points at its own rows, and
+    arrays are copied one chunk at a time to keep memory bounded.
+    """
+    source = zarr.open(source_path, mode='r')
+    target = zarr.open_group(target_path, mode='w')
+    target.attrs.update(source.attrs.asdict())
+
+    for name in ('scenes', 'frames', 'agents', 'traffic_light_faces'):
+        src = source[name]
+        dst = target.create_dataset(
+            name, shape=(src.shape[0] * scale,), chunks=src.chunks,
+            dtype=src.dtype, compressor=src.compressor
+        )
+        step = src.chunks[0]
+        for copy in range(scale):
+            for start in range(0, src.shape[0], step):
+                block = src[start:start + step]
+                for field, child in INTERVAL_FIELDS.get(name, []):
+                    block[field] += copy * source[child].shape[0]
+                offset = copy * src.shape[0] + start
+                dst[offset:offset + len(block)] = block
+    return target_path
+
+
+def _summarize(samples):
+    samples = np.asarray(samples, dtype=float)
+    return {
+        "best": float(samples.min()),
+        "median": float(np.median(samples)),
+        "runs": len(samples),
+    }
+
+
+def bench_decode(zarr_path, repeat):
+    """Rows/s and MB/s decoded reading each array chunk by chunk"""
+    root = zarr.open(zarr_path, mode='r')
+    results = {}
+    for name in ('frames', 'agents', 'traffic_light_faces'):
+        array = root[name]
+        step = array.chunks[0]
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for offset in range(0, array.shape[0], step):
+                array[offset:offset + step]
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results[name] = {
+            "rows": int(array.shape[0]),
+            "seconds": _summarize(timings),
+            "rows_per_s": array.shape[0] / best,
+            "mb_per_s": array.shape[0] * array.dtype.itemsize / best / 1e6,
+        }
+    return results
+
+
+def bench_analysis(zarr_path, num_scenes, repeat):
+    """Scenes/s for the analyzer summary and the scenario context extraction
+
+    `load_and_summarize` times ToyotaSceneAnalyzer.load_scene plus
+    summarize_scene, the work analyze_scene does without its console
+    output and visualization.
+    """
+    analyzer = ToyotaSceneAnalyzer(zarr_path)
+    generator = ToyotaScenarioGenerator(zarr_path)
+    total_scenes = zarr.open(zarr_path, mode='r')['scenes'].shape[0]
+
+    # Spread the scenes over the whole store so larger stores are actually exercised
+    scene_indices = np.unique(
+        np.linspace(0, total_scenes - 1, min(num_scenes, total_scenes)).astype(int)
+    ).tolist()
+    num_scenes = len(scene_indices)
+
+    def load_and_summarize():
+        for scene_idx in scene_indices:
+            analyzer.summarize_scene(*analyzer.load_scene(scene_idx))
+
+    def extract():
+        for scene_idx in scene_indices:
+            generator.extract_scene_context(scene_idx)
+
+    results = {}
+    for name, fn in (('load_and_summarize', load_and_summarize), ('extract_scene_context', extract)):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        results[name] = {
+            "scenes": num_scenes,
+            "store_scenes": total_scenes,
+            "seconds": _summarize(timings),
+            "scenes_per_s": num_scenes / min(timings),
+        }
+    return results
+
+
+def bench_render(zarr_path, num_frames):
+    """Seconds per rendered frame of the scene visualization"""
+    analyzer = ToyotaSceneAnalyzer(zarr_path)
+    root = zarr.open(zarr_path, mode='r')
+    frames = root['frames'][:num_frames]
+    timings = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for frame in frames:
+            agent_start, agent_end = frame['agent_index_interval']
+            agents = root['agents'][agent_start:agent_end]
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                analyzer._create_scene_visualization(frame, agents, output_dir=output_dir)
+            timings.append(time.perf_counter() - start)
+    return {
+        "frames": len(timings),
+        "seconds_per_frame": _summarize(timings),
+    }
+
+
+def bench_model_client(zarr_path, num_requests, latency_ms):
+    """Requests/s and latency percentiles against the stub server"""
+    analyzer = ToyotaSceneAnalyzer(zarr_path)
+    agents = analyzer.summarize_scene(*analyzer.load_scene(0))['agents']
+
+    with StubCompletionServer(latency_ms) as server:
+        model = GraniteModelTrainer(server.url)
+        latencies = []
+        start = time.perf_counter()
+        for i in range(num_requests):
+            prompt = model.build_prompt(agents[i % len(agents)])
+            request_start = time.perf_counter()
+            model.request_completion(prompt)
+            latencies.append(time.perf_counter() - request_start)
+        elapsed = time.perf_counter() - start
+
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        "requests": num_requests,
+        "stub_latency_ms": latency_ms,
+        "requests_per_s": num_requests / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "overhead_p50_ms": float(np.percentile(latencies_ms, 50) - latency_ms),
+    }
+
+
+def run_benchmarks(args):
+    """Run every benchmark and return the machine-readable report"""
+    stores = {"sample": args.zarr_path}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.scale > 1:
+            console.print(f"[yellow]Building {args.scale}x scaled store...[/yellow]")
+            stores[f"scaled_x{args.scale}"] = build_scaled_store(
+                args.zarr_path, args.scaled_store or str(Path(tmp_dir) / 'scaled.zarr'), args.scale
+            )
+        if args.synthetic_scenes:
+            console.print(f"[yellow]Generating {args.synthetic_scenes}-scene synthetic store...[/yellow]")
+            synthetic_path = str(Path(tmp_dir) / 'synthetic.zarr')
+            SyntheticDatasetGenerator(num_scenes=args.synthetic_scenes, seed=0).write(synthetic_path)
+            stores[f"synthetic_{args.synthetic_scenes}"] = synthetic_path
+
+        report = {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "numpy": np.__version__,
+                "zarr": zarr.__version__,
+            },
+            "config": {
+                "scale": args.scale,
+                "synthetic_scenes": args.synthetic_scenes,
+                "repeat": args.repeat,
+                "scenes": args.scenes,
+                "render_frames": args.render_frames,
+                "requests": args.requests,
+                "latency_ms": args.latency_ms,
+            },
+            "stores": {},
+        }
+
+        for label, path in stores.items():
+            console.print(f"[yellow]Benchmarking {label} store...[/yellow]")
+            report["stores"][label] = {
+                "decode": bench_decode(path, args.repeat),
+                "analysis": bench_analysis(path, args.scenes, args.repeat),
+            }
+
+    console.print("[yellow]Benchmarking rendering...[/yellow]")
+    report["render"] = bench_render(args.zarr_path, args.render_frames)
+
+    console.print("[yellow]Benchmarking model client...[/yellow]")
+    report["model_client"] = bench_model_client(args.zarr_path, args.requests, args.latency_ms)
+    return report
+
+
+def _flatten(report):
+    """Headline metrics keyed by dotted name, where higher is better"""
+    metrics = {}
+    for label, store in report["stores"].items():
+        for name, result in store["decode"].items():
+            metrics[f"{label}.decode.{name}.rows_per_s"] = result["rows_per_s"]
+        for name, result in store["analysis"].items():
+            metrics[f"{label}.{name}.scenes_per_s"] = result["scenes_per_s"]
+    metrics["render.frames_per_s"] = 1.0 / report["render"]["seconds_per_frame"]["median"]
+    metrics["model_client.requests_per_s"] = report["model_client"]["requests_per_s"]
+    return metrics
+
+
+def print_report(report, baseline=None):
+    table = Table(title="Benchmark Results")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    if baseline:
+        table.add_column("Baseline", justify="right")
+        table.add_column("Change", justify="right")
+
+    current = _flatten(report)
+    previous = _flatten(baseline) if baseline else {}
+    for name, value in current.items():
+        row = [name, f"{value:,.1f}"]
+        if baseline:
+            if name in previous:
+                change = (value / previous[name] - 1.0) * 100.0
+                color = "green" if change >= 0 else "red"
+                row += [f"{previous[name]:,.1f}", f"[{color}]{change:+.1f}%[/{color}]"]
+            else:
+                row += ["-", "-"]
+        table.add_row(*row)
+
+    client = report["model_client"]
+    table.add_row("model_client.p50_ms", f"{client['p50_ms']:.1f}", *(["", ""] if baseline else []))
+    table.add_row("model_client.p99_ms", f"{client['p99_ms']:.1f}", *(["", ""] if baseline else []))
+    console.print(table)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark store reads, analysis, rendering and model client")
+    parser.add_argument('--zarr-path', default='sample.zarr', help="Path to the zarr dataset")
+    parser.add_argument('--scale', type=int, default=4,
+                        help="Also benchmark a store scaled up by this factor (1 to skip)")
+    parser.add_argument('--scaled-store', default=None,
+                        help="Where to write the scaled store (default: a temporary directory)")
+    parser.add_argument('--synthetic-scenes', type=int, default=0,
+                        help="Also benchmark a generated synthetic store with this many scenes")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per decode/analysis benchmark")
+    parser.add_argument('--scenes', type=int, default=100,
+                        help="Scenes analyzed per run, spread evenly across the store")
+    parser.add_argument('--render-frames', type=int, default=5, help="Frames rendered")
+    parser.add_argument('--requests', type=int, default=50, help="Requests sent to the stub server")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Stub server response latency")
+    parser.add_argument('--output', default='output/benchmark.json', help="Where to write the results")
+    parser.add_argument('--baseline', default=None, help="Previous results file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    console.print(Panel("[bold blue]Benchmarks[/bold blue]"))
+    try:
+        report = run_benchmarks(args)
+
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        print_report(report, baseline)
+
+        console.print(f"\n[green]✓ Benchmark results saved to {output_path}[/green]")
+        return True
+
+    except Exception as e:
+        console.print(f"[red]Error running benchmarks: {str(e)}[/red]")
+        return False
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -9,6 +9,8 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 import json
 
+from profiling import profiler, read_row, read_rows
+
 console = Console()
 
 class ToyotaSceneAnalyzer:
@@ -26,21 +28,45 @@ class ToyotaSceneAnalyzer:
             8: "EMERGENCY_VEHICLE"
         }
 
+    def load_scene(self, scene_idx=0):
+        """Load the scene record, its frames and the agents of its first frame"""
+        root = zarr.open(self.zarr_path, mode='r')
+
+        scene = read_row(root['scenes'], scene_idx, 'store.scenes')
+        frame_start, frame_end = scene['frame_index_interval']
+        frames = read_rows(root['frames'], frame_start, frame_end, 'store.frames')
+
+        agent_start, agent_end = frames[0]['agent_index_interval']
+        agents = read_rows(root['agents'], agent_start, agent_end, 'store.agents')
+        return scene, frames, agents
+
+    def summarize_scene(self, scene, frames, agents):
+        """Build the serializable scene summary from loaded records"""
+        first_frame = frames[0]
+        with profiler.timed('analysis.convert_agents'):
+            converted = [self._convert_agent_data(agent) for agent in agents]
+        profiler.count('analysis.convert_agents', agents=len(agents))
+
+        return {
+            "scene_info": {
+                "duration": (scene['end_time'] - scene['start_time']) / 1e9,
+                "num_frames": len(frames),
+                "host": scene['host']
+            },
+            "ego_vehicle": {
+                "position": first_frame['ego_translation'].tolist(),
+                "rotation": first_frame['ego_rotation'].tolist()
+            },
+            "agents": converted
+        }
+
     def analyze_scene(self, scene_idx=0):
         """Analyze a specific scene with all its components"""
         console.print(Panel("[bold blue]Scene Analysis[/bold blue]"))
         
-        root = zarr.open(self.zarr_path, mode='r')
-        
-        # Get scene data
-        scene = root['scenes'][scene_idx]
-        frame_start, frame_end = scene['frame_index_interval']
-        frames = root['frames'][frame_start:frame_end]
-        
-        # Get first frame and its agents
+        # Get scene data, first frame and its agents
+        scene, frames, agents = self.load_scene(scene_idx)
         first_frame = frames[0]
-        agent_start, agent_end = first_frame['agent_index_interval']
-        agents = root['agents'][agent_start:agent_end]
 
         # Scene Duration
         duration = (scene['end_time'] - scene['start_time']) / 1e9  # Convert to seconds
@@ -78,18 +104,7 @@ class ToyotaSceneAnalyzer:
         # Create visualization
         self._create_scene_visualization(first_frame, agents)
         
-        return {
-            "scene_info": {
-                "duration": duration,
-                "num_frames": len(frames),
-                "host": scene['host']
-            },
-            "ego_vehicle": {
-                "position": first_frame['ego_translation'].tolist(),
-                "rotation": first_frame['ego_rotation'].tolist()
-            },
-            "agents": [self._convert_agent_data(agent) for agent in agents]
-        }
+        return self.summarize_scene(scene, frames, agents)
 
     def _get_agent_type(self, label_probabilities):
         """Get agent type from label probabilities"""
@@ -107,8 +122,14 @@ class ToyotaSceneAnalyzer:
             "track_id": int(agent['track_id'])
         }
 
-    def _create_scene_visualization(self, frame, agents):
+    def _create_scene_visualization(self, frame, agents, output_dir='output'):
         """Create a visualization of the scene"""
+        with profiler.timed('render.scene'):
+            self._render_scene(frame, agents, output_dir)
+        profiler.count('render.scene', agents=len(agents))
+
+    def _render_scene(self, frame, agents, output_dir):
+        """Draw the scene and save it as a PNG"""
         plt.figure(figsize=(15, 10))
         
         # Plot ego vehicle
@@ -157,10 +178,10 @@ class ToyotaSceneAnalyzer:
         plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
         
         # Save visualization
-        output_dir = Path('output')
+        output_dir = Path(output_dir)
         output_dir.mkdir(exist_ok=True)
         plt.savefig(output_dir / 'scene_visualization.png', bbox_inches='tight')
-        console.print("\n[green]Scene visualization saved to output/scene_visualization.png[/green]")
+        console.print(f"\n[green]Scene visualization saved to {output_dir / 'scene_visualization.png'}[/green]")
         plt.close()
 
 def main():
@@ -2,19 +2,31 @@
 
 import requests
 import json
+import time
 from rich.console import Console
 from rich.progress import Progress
 from pathlib import Path
 
+from profiling import profiler
+
 console = Console()
 
 class GraniteModelTrainer:
-    def __init__(self, model_url="http://localhost:8080/completion"):  # Fixed endpoint
+    def __init__(self, model_url="http://localhost:8080/completion", max_retries=0,
+                 retry_backoff=0.5, timeout=120.0):  # Fixed endpoint
         self.model_url = model_url
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.generation_params = {
+            "max_tokens": 500,
+            "temperature": 0.7,
+            "top_p": 0.9
+        }
 
-    def generate_scenario(self, agent_data):
-        """Generate test scenario for an agent"""
-        prompt = f"""<|system|>
+    def build_prompt(self, agent_data):
+        """Build the scenario prompt for an agent"""
+        return f"""<|system|>
 You are a test scenario generator for autonomous vehicles. Generate BDD-style test scenarios.
 <|endoftext|>
 <|user|>
@@ -33,27 +45,67 @@ Scenario: [Scenario Name]
 <|endoftext|>
 <|assistant|>"""
 
-        try:
-            response = requests.post(
-                self.model_url,
-                json={
-                    "prompt": prompt,
-                    "max_tokens": 500,
-                    "temperature": 0.7,
-                    "top_p": 0.9
-                },
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if response.status_code == 200:
-                return response.json().get('content', '')
-            else:
+    def request_completion(self, prompt):
+        """Send a prompt to the model and return the completion text"""
+        with profiler.timed('model.request'):
+            content, retries = self._post_prompt(prompt)
+        profiler.count(
+            'model.request',
+            prompt_chars=len(prompt),
+            response_chars=len(content or ''),
+            retries=retries,
+            failures=int(content is None)
+        )
+        return content
+
+    def _post_prompt(self, prompt):
+        """POST a prompt, retrying connection errors, timeouts and 5xx responses
+
+        Retries wait `retry_backoff` seconds, doubling after each attempt.
+        Returns the completion text (None on failure) and the retry count.
+        """
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+            try:
+                response = requests.post(
+                    self.model_url,
+                    json={"prompt": prompt, **self.generation_params},
+                    headers={"Content-Type": "application/json"},
+                    timeout=self.timeout
+                )
+
+                if response.status_code == 200:
+                    return response.json().get('content', ''), attempt
+
                 console.print(f"[red]Error: {response.status_code} - {response.text}[/red]")
-                return None
-                
-        except Exception as e:
-            console.print(f"[red]Request error: {str(e)}[/red]")
-            return None
+                if response.status_code < 500:
+                    return None, attempt
+
+            # A malformed body will not improve on retry. JSONDecodeError is
+            # also a RequestException, so it has to be caught first
+            except requests.exceptions.JSONDecodeError as e:
+                console.print(f"[red]Invalid model response: {str(e)}[/red]")
+                return None, attempt
+
+            except (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                    requests.exceptions.InvalidSchema) as e:
+                console.print(f"[red]Invalid model URL: {str(e)}[/red]")
+                return None, attempt
+
+            except requests.exceptions.RequestException as e:
+                console.print(f"[red]Request error: {str(e)}[/red]")
+
+            except Exception as e:
+                console.print(f"[red]Request error: {str(e)}[/red]")
+                return None, attempt
+
+        return None, self.max_retries
+
+    def generate_scenario(self, agent_data):
+        """Generate test scenario for an agent"""
+        return self.request_completion(self.build_prompt(agent_data))
 
     def generate_test_suite(self, scene_analysis_path="output/scene_analysis.json"):
         """Generate test scenarios from scene analysis"""
@@ -8,6 +8,8 @@ import requests
 import json
 from pathlib import Path
 
+from profiling import profiler, read_row, read_rows
+
 console = Console()
 
 class ToyotaScenarioGenerator:
@@ -25,26 +27,32 @@ class ToyotaScenarioGenerator:
     def extract_scene_context(self, scene_idx=0):
         """Extract rich context from a scene"""
         root = zarr.open(self.zarr_path, mode='r')
-        scene = root['scenes'][scene_idx]
+        scene = read_row(root['scenes'], scene_idx, 'store.scenes')
         
         # Get all frames for this scene
-        frames = root['frames'][scene['frame_index_interval'][0]:scene['frame_index_interval'][1]]
+        frames = read_rows(root['frames'], scene['frame_index_interval'][0],
+                           scene['frame_index_interval'][1], 'store.frames')
         
         # Get first and last frame for trajectory analysis
         first_frame = frames[0]
         last_frame = frames[-1]
         
         # Get agents and their trajectories
-        initial_agents = root['agents'][first_frame['agent_index_interval'][0]:
-                                      first_frame['agent_index_interval'][1]]
-        final_agents = root['agents'][last_frame['agent_index_interval'][0]:
-                                    last_frame['agent_index_interval'][1]]
+        initial_agents = read_rows(root['agents'], first_frame['agent_index_interval'][0],
+                                   first_frame['agent_index_interval'][1], 'store.agents')
+        final_agents = read_rows(root['agents'], last_frame['agent_index_interval'][0],
+                                 last_frame['agent_index_interval'][1], 'store.agents')
 
         # Get traffic light states if available
         traffic_lights = []
         if 'traffic_light_faces_index_interval' in first_frame.dtype.names:
             tl_start, tl_end = first_frame['traffic_light_faces_index_interval']
-            traffic_lights = root['traffic_light_faces'][tl_start:tl_end]
+            traffic_lights = read_rows(root['traffic_light_faces'], tl_start, tl_end,
+                                       'store.traffic_light_faces')
+
+        with profiler.timed('analysis.agent_trajectories'):
+            agents = self._analyze_agents(initial_agents, final_agents)
+        profiler.count('analysis.agent_trajectories', agents=len(agents))
 
         return {
             "scene_info": {
@@ -57,8 +65,8 @@ class ToyotaScenarioGenerator:
                 "final_position": last_frame['ego_translation'].tolist(),
                 "initial_rotation": first_frame['ego_rotation'].tolist()
             },
-            "agents": self._analyze_agents(initial_agents, final_agents),
-            "traffic": self._analyze_traffic(traffic_lights) if traffic_lights else None
+            "agents": agents,
+            "traffic": self._analyze_traffic(traffic_lights) if len(traffic_lights) else None
         }
 
     def _analyze_agents(self, initial_agents, final_agents):
@@ -130,26 +138,36 @@ Generate a BDD format test scenario that includes:
 <|endoftext|>
 <|assistant|>"""
 
-        try:
-            response = requests.post(
-                self.model_url,
-                json={
-                    "prompt": prompt,
-                    "max_tokens": 1000,
-                    "temperature": 0.7
-                },
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if response.status_code == 200:
-                return response.json()['content']
-            else:
-                console.print(f"[red]Error: {response.status_code} - {response.text}[/red]")
-                return None
+        content = None
+        with profiler.timed('model.request'):
+            try:
+                response = requests.post(
+                    self.model_url,
+                    json={
+                        "prompt": prompt,
+                        "max_tokens": 1000,
+                        "temperature": 0.7
+                    },
+                    headers={"Content-Type": "application/json"}
+                )
                 
-        except Exception as e:
-            console.print(f"[red]Request error: {str(e)}[/red]")
-            return None
+                if response.status_code == 200:
+                    content = response.json()['content']
+                else:
+                    console.print(f"[red]Error: {response.status_code} - {response.text}[/red]")
+                    
+            except Exception as e:
+                console.print(f"[red]Request error: {str(e)}[/red]")
+
+        # Same fields as GraniteModelTrainer.request_completion; this client never retries
+        profiler.count(
+            'model.request',
+            prompt_chars=len(prompt),
+            response_chars=len(content or ''),
+            retries=0,
+            failures=int(content is None)
+        )
+        return content
 
     def _format_agents(self, agents):
         """Format agent information for prompt"""
@@ -0,0 +1,342 @@
+# src/pipeline.py
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from rich.console import Console
+from rich.panel import Panel
+from rich.progress import Progress
+
+from data_loader import ToyotaSceneAnalyzer
+from model_trainer import GraniteModelTrainer
+from profiling import profiler
+
+console = Console()
+
+# Bump when a stage's logic changes so stale cache entries are not reused
+PIPELINE_VERSION = 2
+
+
+def _update_digest(h, part):
+    """Feed one value into a hash, recursing into dicts, lists and tuples
+
+    Arrays and numpy scalars are hashed by their raw bytes, never by their
+    printed form, so every element and full float precision is covered.
+    """
+    if isinstance(part, (np.ndarray, np.generic)):
+        part = np.ascontiguousarray(part)
+        h.update(b"a" + str(part.dtype).encode() + str(part.shape).encode())
+        h.update(part.tobytes())
+    elif isinstance(part, dict):
+        h.update(b"d%d" % len(part))
+        for key in sorted(part, key=str):
+            _update_digest(h, str(key))
+            _update_digest(h, part[key])
+    elif isinstance(part, (list, tuple)):
+        h.update(b"l%d" % len(part))
+        for item in part:
+            _update_digest(h, item)
+    elif isinstance(part, bytes):
+        h.update(b"b" + part)
+    elif isinstance(part, str):
+        h.update(b"s" + part.encode())
+    else:
+        h.update(b"j" + json.dumps(part).encode())
+    h.update(b"\0")
+
+
+def _digest(*parts):
+    """Content hash of arrays, strings and JSON-serializable values"""
+    h = hashlib.sha256()
+    for part in parts:
+        _update_digest(h, part)
+    return h.hexdigest()
+
+
+def _store_fingerprint(zarr_path):
+    """Fingerprint a zarr store from its file names, sizes and mtimes"""
+    root = Path(zarr_path)
+    if not root.is_dir():
+        stat = root.stat()
+        return _digest(str(root), stat.st_size, stat.st_mtime_ns)
+
+    entries = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = Path(dirpath) / name
+            stat = path.stat()
+            entries.append((str(path.relative_to(root)), stat.st_size, stat.st_mtime_ns))
+    return _digest(sorted(entries))
+
+
+def _file_digest(path):
+    """Content hash of a file, or None when it does not exist"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+class StageCache:
+    """Pickle-backed cache of stage outputs keyed by content hash"""
+
+    def __init__(self, cache_dir="output/.cache"):
+        self.cache_dir = Path(cache_dir)
+
+    def _path(self, namespace, key):
+        return self.cache_dir / namespace / f"{key}.pkl"
+
+    def get(self, namespace, key):
+        """Return the cached entry or None when missing or unreadable"""
+        path = self._path(namespace, key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # Truncated files and entries pickled under other numpy or module
+            # versions fail in many ways; all of them just mean recompute
+            return None
+
+    def put(self, namespace, key, value):
+        """Atomically store an entry"""
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temp file keeps concurrent runs from clobbering each other
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as f:
+            try:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, path)
+
+
+class ScenarioPipeline:
+    """Scene-to-scenario pipeline with content-hashed, cached stages
+
+    Stages run in order load → analyze → select → prompt → generate → write.
+    Each stage is keyed by the hash of its inputs; when the key matches a
+    cached entry the stage is skipped and its stored output is reused.
+    Generate caches completions per prompt, and write is only skipped while
+    the files on disk still match what it last wrote.
+    """
+
+    def __init__(self, zarr_path="sample.zarr", scene_idx=0,
+                 model_url="http://localhost:8080/completion",
+                 output_dir="output", cache_dir=None,
+                 max_agents=None, agent_types=None, force=False, max_retries=0,
+                 timeout=120.0):
+        self.zarr_path = zarr_path
+        self.scene_idx = scene_idx
+        self.output_dir = Path(output_dir)
+        self.cache = StageCache(cache_dir or self.output_dir / '.cache')
+        self.max_agents = max_agents
+        self.agent_types = sorted(agent_types) if agent_types else None
+        self.force = force
+
+        self.analyzer = ToyotaSceneAnalyzer(zarr_path)
+        self.model = GraniteModelTrainer(model_url, max_retries=max_retries, timeout=timeout)
+
+    def _run_stage(self, name, inputs, fn):
+        """Run a stage unless its inputs hash to a cached entry
+
+        Returns the stage output and the content hash of that output.
+        """
+        with profiler.timed(f'pipeline.{name}'):
+            key = _digest(name, PIPELINE_VERSION, *inputs)
+            cached = None if self.force else self.cache.get(name, key)
+            if cached is not None:
+                console.print(f"[dim]↺ {name}: cached[/dim]")
+                profiler.count(f'pipeline.{name}', cache_hits=1)
+                return cached
+
+            console.print(f"[yellow]▶ {name}[/yellow]")
+            output = fn()
+            entry = (output, _digest(name, output))
+            self.cache.put(name, key, entry)
+            return entry
+
+    def _load(self):
+        scene, frames, agents = self.analyzer.load_scene(self.scene_idx)
+        return {"scene": scene, "frames": frames, "agents": agents}
+
+    def _select(self, analysis):
+        """Pick the agents that scenarios are generated for"""
+        agents = analysis['agents']
+        if self.agent_types:
+            agents = [a for a in agents if a['type'] in self.agent_types]
+        if self.max_agents is not None:
+            agents = agents[:self.max_agents]
+        return agents
+
+    def _generate(self, prompts):
+        """Query the model for each prompt, reusing cached completions"""
+        results = []
+        with Progress(console=console) as progress:
+            task = progress.add_task("Generating scenarios...", total=len(prompts))
+            for prompt in prompts:
+                key = _digest(self.model.model_url, self.model.generation_params, prompt)
+                scenario = None if self.force else self.cache.get('completion', key)
+                if scenario is not None:
+                    profiler.count('pipeline.generate', cache_hits=1)
+                else:
+                    scenario = self.model.request_completion(prompt)
+                    # Failed requests are not cached so they are retried next run
+                    if scenario is not None:
+                        self.cache.put('completion', key, scenario)
+                results.append(scenario)
+                progress.advance(task)
+        return results
+
+    def _write(self, raw, analysis, selected, scenarios):
+        """Write the analysis, generated scenarios and scene visualization"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        analysis_path = self.output_dir / 'scene_analysis.json'
+        with open(analysis_path, 'w') as f:
+            json.dump(analysis, f, indent=2)
+
+        generated = [
+            {"agent_data": agent, "generated_scenario": scenario}
+            for agent, scenario in zip(selected, scenarios)
+            if scenario
+        ]
+        scenarios_path = self.output_dir / 'generated_scenarios.json'
+        with open(scenarios_path, 'w') as f:
+            json.dump(generated, f, indent=2)
+
+        self.analyzer._create_scene_visualization(
+            raw['frames'][0], raw['agents'], output_dir=self.output_dir
+        )
+        visualization_path = self.output_dir / 'scene_visualization.png'
+        return [str(analysis_path), str(scenarios_path), str(visualization_path)]
+
+    def _run_write(self, raw, analysis, selected, scenarios, inputs):
+        """Write the outputs unless the files on disk already match them
+
+        Outputs live at fixed paths that runs for other scenes overwrite, so
+        the cache entry is a manifest of the content hash of every written
+        file. The stage is skipped only when the files on disk still match it.
+        """
+        with profiler.timed('pipeline.write'):
+            key = _digest('write', PIPELINE_VERSION, str(self.output_dir.resolve()), *inputs)
+            manifest = None if self.force else self.cache.get('write', key)
+            if manifest is not None and all(
+                _file_digest(path) == digest for path, digest in manifest.items()
+            ):
+                console.print("[dim]↺ write: cached[/dim]")
+                profiler.count('pipeline.write', cache_hits=1)
+                return list(manifest)
+
+            console.print("[yellow]▶ write[/yellow]")
+            written = self._write(raw, analysis, selected, scenarios)
+            self.cache.put('write', key, {path: _file_digest(path) for path in written})
+            return written
+
+    def run(self):
+        """Run all stages and return the list of written files"""
+        console.print(Panel("[bold blue]Scenario Pipeline[/bold blue]"))
+
+        raw, raw_hash = self._run_stage(
+            'load',
+            [os.path.abspath(self.zarr_path), _store_fingerprint(self.zarr_path), self.scene_idx],
+            self._load
+        )
+        analysis, analysis_hash = self._run_stage(
+            'analyze', [raw_hash],
+            lambda: self.analyzer.summarize_scene(raw['scene'], raw['frames'], raw['agents'])
+        )
+        selected, selected_hash = self._run_stage(
+            'select', [analysis_hash, self.max_agents, self.agent_types],
+            lambda: self._select(analysis)
+        )
+        prompts, _ = self._run_stage(
+            'prompt', [selected_hash],
+            lambda: [self.model.build_prompt(agent) for agent in selected]
+        )
+
+        # Completions are cached per prompt inside the stage, so only prompts
+        # that changed since the last run reach the model
+        console.print("[yellow]▶ generate[/yellow]")
+        with profiler.timed('pipeline.generate'):
+            scenarios = self._generate(prompts)
+
+        written = self._run_write(raw, analysis, selected, scenarios,
+                                  [raw_hash, analysis_hash, selected_hash, _digest(scenarios)])
+
+        failed = sum(1 for scenario in scenarios if scenario is None)
+        if failed:
+            console.print(f"[red]{failed} of {len(scenarios)} scenarios failed to generate[/red]")
+        return written, failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate test scenarios from a scene")
+    parser.add_argument('--zarr-path', default='sample.zarr', help="Path to the zarr dataset")
+    parser.add_argument('--scene', type=int, default=0, help="Index of the scene to process")
+    parser.add_argument('--model-url', default='http://localhost:8080/completion',
+                        help="Completion endpoint of the model server")
+    parser.add_argument('--output-dir', default='output', help="Directory for generated files")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Stage cache directory (default: <output-dir>/.cache)")
+    parser.add_argument('--max-agents', type=int, default=None,
+                        help="Only generate scenarios for the first N selected agents")
+    parser.add_argument('--agent-type', action='append', dest='agent_types',
+                        help="Only generate scenarios for this agent type (repeatable)")
+    parser.add_argument('--force', action='store_true', help="Ignore cached stage outputs")
+    parser.add_argument('--retries', type=int, default=0,
+                        help="Retries per model request on connection errors and 5xx responses")
+    parser.add_argument('--timeout', type=float, default=120.0,
+                        help="Seconds to wait for each model response before retrying")
+    parser.add_argument('--profile', nargs='?', const='output/profile.json', default=None,
+                        metavar='PATH',
+                        help="Write a per-stage timing and memory report (default: output/profile.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile:
+        profiler.enable()
+
+    try:
+        pipeline = ScenarioPipeline(
+            zarr_path=args.zarr_path,
+            scene_idx=args.scene,
+            model_url=args.model_url,
+            output_dir=args.output_dir,
+            cache_dir=args.cache_dir,
+            max_agents=args.max_agents,
+            agent_types=args.agent_types,
+            force=args.force,
+            max_retries=args.retries,
+            timeout=args.timeout
+        )
+        written, failed = pipeline.run()
+
+        console.print("\n[green]✓ Pipeline outputs:[/green]")
+        for path in written:
+            console.print(f"- {path}")
+        return failed == 0
+
+    except Exception as e:
+        console.print(f"[red]Error in pipeline: {str(e)}[/red]")
+        return False
+
+    finally:
+        if args.profile:
+            profiler.write_report(args.profile)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
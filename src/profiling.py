@@ -0,0 +1,164 @@
+# src/profiling.py
+
+import json
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+# Shared no-op context returned while profiling is disabled
+_DISABLED = nullcontext()
+
+
+class _Timer:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.stats['calls'] += 1
+        self.stats['seconds'] += elapsed
+        self.stats['max_seconds'] = max(self.stats['max_seconds'], elapsed)
+        return False
+
+
+class Profiler:
+    """Named timers and counters for hot paths
+
+    Disabled by default: `timed` then returns a shared no-op context and
+    `count` returns immediately, so instrumented code pays one attribute
+    check per call.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def reset(self):
+        self.stats = {}
+
+    def _entry(self, name):
+        entry = self.stats.get(name)
+        if entry is None:
+            entry = self.stats[name] = {
+                'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'counters': {}
+            }
+        return entry
+
+    def timed(self, name):
+        """Context manager adding the elapsed time to `name`"""
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self._entry(name))
+
+    def count(self, name, **values):
+        """Add each keyword value to the counters of `name`"""
+        if not self.enabled:
+            return
+        counters = self._entry(name)['counters']
+        for key, value in values.items():
+            counters[key] = counters.get(key, 0) + value
+
+    def report(self):
+        """Per-stage summary plus the peak resident set size of the process"""
+        stages = {}
+        for name, entry in sorted(self.stats.items()):
+            stages[name] = {
+                'calls': entry['calls'],
+                'total_s': entry['seconds'],
+                'mean_ms': entry['seconds'] / entry['calls'] * 1000.0 if entry['calls'] else 0.0,
+                'max_ms': entry['max_seconds'] * 1000.0,
+                **entry['counters'],
+            }
+        return {'stages': stages, 'peak_rss_mb': peak_rss_mb()}
+
+    def write_report(self, path):
+        """Print the summary table and save it as JSON"""
+        report = self.report()
+
+        table = Table(title="Profile")
+        table.add_column("Stage")
+        table.add_column("Calls", justify="right")
+        table.add_column("Total (s)", justify="right")
+        table.add_column("Mean (ms)", justify="right")
+        table.add_column("Max (ms)", justify="right")
+        table.add_column("Counters")
+        for name, stage in report['stages'].items():
+            counters = {k: v for k, v in stage.items()
+                        if k not in ('calls', 'total_s', 'mean_ms', 'max_ms')}
+            table.add_row(
+                name,
+                str(stage['calls']),
+                f"{stage['total_s']:.3f}",
+                f"{stage['mean_ms']:.2f}",
+                f"{stage['max_ms']:.2f}",
+                ", ".join(f"{k}={v:,}" for k, v in counters.items())
+            )
+        console.print(table)
+        if report['peak_rss_mb'] is not None:
+            console.print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        console.print(f"[green]✓ Profile saved to {path}[/green]")
+        return report
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in megabytes, or None if unavailable"""
+    try:
+        import resource
+    except ImportError:
+        # The resource module is Unix-only
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kibibytes on Linux
+    peak_bytes = peak if sys.platform == 'darwin' else peak * 1024
+    return peak_bytes / 1e6
+
+
+def read_rows(array, start, stop, name):
+    """Read array[start:stop], recording rows, chunks touched and bytes decoded"""
+    if not profiler.enabled:
+        return array[start:stop]
+
+    with profiler.timed(name):
+        rows = array[start:stop]
+
+    chunk_len = array.chunks[0]
+    chunks = range(start // chunk_len, (stop - 1) // chunk_len + 1) if stop > start else range(0)
+    # Whole chunks are decompressed even when only part of one is returned
+    decoded_rows = sum(min(chunk_len, array.shape[0] - i * chunk_len) for i in chunks)
+    profiler.count(
+        name,
+        rows=len(rows),
+        chunks_touched=len(chunks),
+        bytes_decoded=decoded_rows * array.dtype.itemsize,
+    )
+    return rows
+
+
+def read_row(array, idx, name):
+    """Read the single record array[idx], accepting negative indices"""
+    num_rows = array.shape[0]
+    if not -num_rows <= idx < num_rows:
+        raise IndexError(f"index {idx} is out of bounds for {name} with {num_rows} rows")
+    idx = idx % num_rows
+    return read_rows(array, idx, idx + 1, name)[0]
+
+
+profiler = Profiler()
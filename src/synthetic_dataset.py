@@ -0,0 +1,357 @@
+# src/synthetic_dataset.py
+
+import argparse
+import sys
+
+import numcodecs
+import numpy as np
+import zarr
+from rich.console import Console
+from rich.panel import Panel
+from rich.progress import Progress
+
+console = Console()
+
+# Structured dtypes and chunking of the Toyota prediction dataset
+SCENE_DTYPE = np.dtype([
+    ('frame_index_interval', '<i8', (2,)),
+    ('host', '<U16'),
+    ('start_time', '<i8'),
+    ('end_time', '<i8'),
+])
+FRAME_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('agent_index_interval', '<i8', (2,)),
+    ('traffic_light_faces_index_interval', '<i8', (2,)),
+    ('ego_translation', '<f8', (3,)),
+    ('ego_rotation', '<f8', (3, 3)),
+])
+AGENT_DTYPE = np.dtype([
+    ('centroid', '<f8', (2,)),
+    ('extent', '<f4', (3,)),
+    ('yaw', '<f4'),
+    ('velocity', '<f4', (2,)),
+    ('track_id', '<u8'),
+    ('label_probabilities', '<f4', (17,)),
+])
+TRAFFIC_LIGHT_FACE_DTYPE = np.dtype([
+    ('face_id', '<U16'),
+    ('traffic_light_id', '<U16'),
+    ('traffic_light_face_status', '<f4', (3,)),
+])
+
+CHUNKS = {
+    'scenes': 10000,
+    'frames': 10000,
+    'agents': 20000,
+    'traffic_light_faces': 10000,
+}
+
+LABELS = [
+    "PERCEPTION_LABEL_NOT_SET",
+    "PERCEPTION_LABEL_UNKNOWN",
+    "PERCEPTION_LABEL_DONTCARE",
+    "PERCEPTION_LABEL_CAR",
+    "PERCEPTION_LABEL_VAN",
+    "PERCEPTION_LABEL_TRAM",
+    "PERCEPTION_LABEL_BUS",
+    "PERCEPTION_LABEL_TRUCK",
+    "PERCEPTION_LABEL_EMERGENCY_VEHICLE",
+    "PERCEPTION_LABEL_OTHER_VEHICLE",
+    "PERCEPTION_LABEL_BICYCLE",
+    "PERCEPTION_LABEL_MOTORCYCLE",
+    "PERCEPTION_LABEL_CYCLIST",
+    "PERCEPTION_LABEL_MOTORCYCLIST",
+    "PERCEPTION_LABEL_PEDESTRIAN",
+    "PERCEPTION_LABEL_ANIMAL",
+    "AVRESEARCH_LABEL_DONTCARE",
+]
+
+# Agent classes: label index, share of agents, mean extent (L, W, H), speed range (m/s)
+AGENT_CLASSES = [
+    (3, 0.70, (4.5, 1.9, 1.6), (0.0, 15.0)),   # CAR
+    (14, 0.15, (0.7, 0.7, 1.8), (0.0, 1.8)),   # PEDESTRIAN
+    (12, 0.05, (1.8, 0.6, 1.7), (2.0, 7.0)),   # CYCLIST
+    (7, 0.05, (8.0, 2.5, 3.2), (0.0, 12.0)),   # TRUCK
+    (6, 0.05, (12.0, 2.6, 3.2), (0.0, 10.0)),  # BUS
+]
+
+FRAME_INTERVAL_NS = 100_000_000  # 10 Hz
+PARKED_SHARE = 0.3
+
+# Track lifetimes in frames are lognormal; sample.zarr has a median of about
+# 6 frames and a mean of about 11, with few tracks spanning a whole scene
+TRACK_LIFETIME_MEDIAN = 6.0
+TRACK_LIFETIME_SIGMA = 1.1
+
+
+class _ChunkWriter:
+    """Append rows to a zarr array in whole chunks to avoid partial rewrites"""
+
+    def __init__(self, array):
+        self.array = array
+        self.chunk_len = array.chunks[0]
+        self.pending = []
+        self.pending_rows = 0
+
+    def append(self, rows):
+        self.pending.append(rows)
+        self.pending_rows += len(rows)
+        if self.pending_rows >= self.chunk_len:
+            self._flush(whole_chunks=True)
+
+    def _flush(self, whole_chunks):
+        if not self.pending_rows:
+            return
+        rows = np.concatenate(self.pending)
+        cut = len(rows) - len(rows) % self.chunk_len if whole_chunks else len(rows)
+        if cut:
+            self.array.append(rows[:cut])
+        rest = rows[cut:]
+        self.pending = [rest] if len(rest) else []
+        self.pending_rows = len(rest)
+
+    def close(self):
+        self._flush(whole_chunks=False)
+
+
+def _rotation_matrices(yaw):
+    """3x3 rotation matrices about the z axis for an array of yaw angles"""
+    cos, sin = np.cos(yaw), np.sin(yaw)
+    rotation = np.zeros(yaw.shape + (3, 3))
+    rotation[..., 0, 0] = cos
+    rotation[..., 0, 1] = -sin
+    rotation[..., 1, 0] = sin
+    rotation[..., 1, 1] = cos
+    rotation[..., 2, 2] = 1.0
+    return rotation
+
+
+class SyntheticDatasetGenerator:
+    """Write a synthetic store with the dataset's dtypes and interval layout
+
+    Scenes are generated one at a time with vectorized motion and streamed
+    to disk chunk by chunk, so memory stays bounded by a single scene no
+    matter how many scenes are written.
+    """
+
+    def __init__(self, num_scenes=100, frames_per_scene=248, agents_per_frame=76,
+                 lights_per_frame=12, seed=0):
+        self.num_scenes = num_scenes
+        self.frames_per_scene = frames_per_scene
+        self.agents_per_frame = agents_per_frame
+        self.lights_per_frame = lights_per_frame
+        self.rng = np.random.default_rng(seed)
+
+        self.class_labels = np.array([c[0] for c in AGENT_CLASSES])
+        self.class_shares = np.array([c[1] for c in AGENT_CLASSES])
+        self.class_extents = np.array([c[2] for c in AGENT_CLASSES])
+        self.class_speeds = np.array([c[3] for c in AGENT_CLASSES])
+
+        # A track of lifetime L is visible in a given frame with probability
+        # L / (frames + L - 1); measure its mean once to size each scene
+        lifetimes = self._track_lifetimes(np.random.default_rng(0), 100_000)
+        self.track_visibility = np.mean(lifetimes / (frames_per_scene + lifetimes - 1))
+
+    def _track_lifetimes(self, rng, num_tracks):
+        """Whole-frame track lifetimes between 1 and the scene length"""
+        return np.clip(
+            np.rint(rng.lognormal(np.log(TRACK_LIFETIME_MEDIAN), TRACK_LIFETIME_SIGMA, num_tracks)),
+            1, self.frames_per_scene
+        ).astype(int)
+
+    def _agents(self, ego_path, dt):
+        """Agent rows of one scene in frame order, plus the agent count per frame
+
+        Each track gets its own entry frame and lifetime, so the set of
+        visible agents changes from frame to frame. Track ids are assigned
+        in order of appearance and stay fixed for the whole scene.
+        """
+        rng = self.rng
+        frames = self.frames_per_scene
+
+        # Enough tracks that about agents_per_frame are visible in each frame
+        num_tracks = max(1, rng.poisson(self.agents_per_frame / self.track_visibility))
+
+        lifetime = self._track_lifetimes(rng, num_tracks)
+        # Tracks may have entered before the scene starts, so early frames are populated too
+        entry = rng.integers(1 - lifetime, frames)
+        exit_ = np.minimum(entry + lifetime, frames)
+        entry = np.maximum(entry, 0)
+        order = np.argsort(entry, kind='stable')
+        entry, exit_ = entry[order], exit_[order]
+
+        classes = rng.choice(len(AGENT_CLASSES), size=num_tracks, p=self.class_shares)
+        low, high = self.class_speeds[classes].T
+        speed = rng.uniform(low, high)
+        speed[rng.random(num_tracks) < PARKED_SHARE] = 0.0
+        heading = rng.uniform(-np.pi, np.pi, num_tracks)
+        yaw_rate = rng.normal(0.0, 0.05, num_tracks)
+        accel = rng.normal(0.0, 0.3, num_tracks)
+
+        # One row per visible (track, frame), grouped by track
+        tracks = np.arange(num_tracks)
+        lengths = exit_ - entry
+        segment_start = np.cumsum(lengths) - lengths
+        track_of_row = np.repeat(tracks, lengths)
+        row_in_track = np.arange(lengths.sum()) - np.repeat(segment_start, lengths)
+        frame_of_row = entry[track_of_row] + row_in_track
+
+        t = frame_of_row * dt
+        yaw = heading[track_of_row] + yaw_rate[track_of_row] * t
+        # Moving agents speed up or slow down but stay within their class range
+        speed_t = np.clip(speed[track_of_row] + accel[track_of_row] * t, 0.0, high[track_of_row])
+        speed_t *= speed[track_of_row] > 0
+        velocity = np.stack([speed_t * np.cos(yaw), speed_t * np.sin(yaw)], axis=-1)
+
+        # Integrate each track from its entry frame with a segmented cumulative sum
+        travelled = np.cumsum(velocity * dt, axis=0)
+        travelled -= np.repeat(travelled[segment_start], lengths, axis=0)
+        start = ego_path[entry] + rng.normal(0.0, 30.0, (num_tracks, 2))
+
+        extent = self.class_extents[classes] * rng.normal(1.0, 0.08, (num_tracks, 3))
+        probabilities = np.zeros((num_tracks, len(LABELS)), dtype=np.float32)
+        probabilities[tracks, self.class_labels[classes]] = 1.0
+
+        agents = np.zeros(len(track_of_row), dtype=AGENT_DTYPE)
+        agents['centroid'] = start[track_of_row] + travelled
+        agents['extent'] = extent[track_of_row]
+        agents['yaw'] = np.arctan2(np.sin(yaw), np.cos(yaw))
+        agents['velocity'] = velocity
+        agents['track_id'] = track_of_row + 1
+        agents['label_probabilities'] = probabilities[track_of_row]
+
+        # Store rows frame by frame, ordered by track id within each frame
+        agents = agents[np.lexsort((track_of_row, frame_of_row))]
+        return agents, np.bincount(frame_of_row, minlength=frames)
+
+    def _traffic_lights(self, num_lights, t):
+        """Traffic light face rows of one scene, shaped (frames, lights)"""
+        rng = self.rng
+        frames = self.frames_per_scene
+        ids = rng.integers(0, 36 ** 4, size=(num_lights, 2))
+        face_ids = np.array(['/' + np.base_repr(i, 36).rjust(4, '0') for i in ids[:, 0]])
+        light_ids = np.array(['/' + np.base_repr(i, 36).rjust(4, '0') for i in ids[:, 1]])
+
+        # Each light cycles red → green → yellow with its own period and phase
+        period = rng.uniform(30.0, 60.0, num_lights)
+        phase = rng.uniform(0.0, 1.0, num_lights)
+        position = (t[:, None] / period + phase) % 1.0
+        status = np.where(position < 0.45, 0, np.where(position < 0.9, 1, 2))
+
+        lights = np.zeros((frames, num_lights), dtype=TRAFFIC_LIGHT_FACE_DTYPE)
+        lights['face_id'] = face_ids
+        lights['traffic_light_id'] = light_ids
+        lights['traffic_light_face_status'] = np.eye(3, dtype=np.float32)[status]
+        return lights
+
+    def _scene(self, scene_idx, frame_offset, agent_offset, light_offset, start_time):
+        """Scene, frame, agent and traffic light rows for one scene"""
+        rng = self.rng
+        frames = self.frames_per_scene
+        dt = FRAME_INTERVAL_NS / 1e9
+        t = np.arange(frames) * dt
+
+        num_lights = rng.poisson(self.lights_per_frame) if self.lights_per_frame else 0
+
+        # Ego drives a gentle curve from a random start
+        ego_heading = rng.uniform(-np.pi, np.pi) + rng.normal(0.0, 0.03) * t
+        ego_speed = rng.uniform(0.0, 12.0)
+        ego_xy = rng.uniform(-3000.0, 3000.0, 2)
+        ego_velocity = ego_speed * np.stack([np.cos(ego_heading), np.sin(ego_heading)], axis=-1)
+        ego_path = ego_xy + np.cumsum(ego_velocity, axis=0) * dt - ego_velocity[0] * dt
+
+        agents, agent_counts = self._agents(ego_path, dt)
+        lights = self._traffic_lights(num_lights, t)
+
+        frame_rows = np.zeros(frames, dtype=FRAME_DTYPE)
+        frame_rows['timestamp'] = start_time + np.arange(frames) * FRAME_INTERVAL_NS
+        agent_ends = agent_offset + np.cumsum(agent_counts)
+        frame_rows['agent_index_interval'] = np.stack([agent_ends - agent_counts, agent_ends], axis=-1)
+        light_starts = light_offset + np.arange(frames) * num_lights
+        frame_rows['traffic_light_faces_index_interval'] = np.stack(
+            [light_starts, light_starts + num_lights], axis=-1
+        )
+        frame_rows['ego_translation'][:, :2] = ego_path
+        frame_rows['ego_translation'][:, 2] = 280.0 + rng.normal(0.0, 0.05, frames)
+        frame_rows['ego_rotation'] = _rotation_matrices(ego_heading)
+
+        scene_row = np.zeros(1, dtype=SCENE_DTYPE)
+        scene_row['frame_index_interval'] = [frame_offset, frame_offset + frames]
+        scene_row['host'] = f"host-a{scene_idx % 100:03d}"
+        scene_row['start_time'] = start_time
+        scene_row['end_time'] = start_time + frames * FRAME_INTERVAL_NS
+
+        return scene_row, frame_rows, agents, lights.reshape(-1)
+
+    def write(self, zarr_path):
+        """Generate every scene and stream it into a new store at `zarr_path`"""
+        root = zarr.open_group(zarr_path, mode='w')
+        root.attrs.update({"format_version": 2, "labels": LABELS})
+
+        compressor = numcodecs.Blosc(cname='lz4', clevel=5, shuffle=numcodecs.Blosc.SHUFFLE)
+        writers = {}
+        for name, dtype in (('scenes', SCENE_DTYPE), ('frames', FRAME_DTYPE),
+                            ('agents', AGENT_DTYPE), ('traffic_light_faces', TRAFFIC_LIGHT_FACE_DTYPE)):
+            array = root.create_dataset(
+                name, shape=(0,), chunks=(CHUNKS[name],), dtype=dtype, compressor=compressor
+            )
+            writers[name] = _ChunkWriter(array)
+
+        offsets = {name: 0 for name in writers}
+        start_time = 1572643684617362176
+        with Progress(console=console) as progress:
+            task = progress.add_task("Writing scenes...", total=self.num_scenes)
+            for scene_idx in range(self.num_scenes):
+                rows = self._scene(
+                    scene_idx, offsets['frames'], offsets['agents'],
+                    offsets['traffic_light_faces'], start_time
+                )
+                for name, block in zip(('scenes', 'frames', 'agents', 'traffic_light_faces'), rows):
+                    writers[name].append(block)
+                    offsets[name] += len(block)
+                start_time = int(rows[0]['end_time'][0]) + FRAME_INTERVAL_NS
+                progress.advance(task)
+
+        for writer in writers.values():
+            writer.close()
+        return offsets
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic dataset for scale testing")
+    parser.add_argument('zarr_path', help="Where to write the synthetic store")
+    parser.add_argument('--scenes', type=int, default=1000, help="Number of scenes")
+    parser.add_argument('--frames-per-scene', type=int, default=248, help="Frames in each scene")
+    parser.add_argument('--agents-per-frame', type=int, default=76,
+                        help="Mean number of agents visible per frame")
+    parser.add_argument('--lights-per-frame', type=int, default=12,
+                        help="Mean number of traffic light faces per frame (drawn per scene)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    console.print(Panel("[bold blue]Synthetic Dataset[/bold blue]"))
+    try:
+        generator = SyntheticDatasetGenerator(
+            num_scenes=args.scenes,
+            frames_per_scene=args.frames_per_scene,
+            agents_per_frame=args.agents_per_frame,
+            lights_per_frame=args.lights_per_frame,
+            seed=args.seed
+        )
+        counts = generator.write(args.zarr_path)
+
+        console.print(f"\n[green]✓ Synthetic store written to {args.zarr_path}[/green]")
+        for name, count in counts.items():
+            console.print(f"- {name}: {count:,} rows")
+        return True
+
+    except Exception as e:
+        console.print(f"[red]Error writing synthetic dataset: {str(e)}[/red]")
+        return False
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -23,15 +23,14 @@ pip install -r requirements.txt
 # Create required directories
 mkdir -p logs output
 
-# Run data analysis
-echo -e "${GREEN}Running dataset analysis...${NC}"
-python src/data_loader.py
-python src/model_trainer.py
+# Run the cached scene-to-scenario pipeline
+echo -e "${GREEN}Running scenario pipeline...${NC}"
+python src/pipeline.py "$@"
 
 # Check if analysis was successful
 if [ $? -eq 0 ]; then
     echo -e "${GREEN}Dataset analysis completed successfully!${NC}"
-    echo "Check output/dataset_analysis.json for detailed information"
+    echo "Check output/scene_analysis.json and output/generated_scenarios.json for detailed information"
 else
     echo -e "${RED}Dataset analysis failed. Please check the logs.${NC}"
     exit 1